@@ -0,0 +1,25 @@
+# modules/disk_cache.py
+import os
+
+def sweep_disk_cache(directory, max_bytes):
+    """directory 内のファイルの合計が max_bytes を超えていたら、長く使われていないものから削除する"""
+    # キャッシュ側はファイルを使うたびに更新日時を使用日時として記録している
+    try:
+        entries = []
+        total = 0
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        if total <= max_bytes:
+            return
+        entries.sort()
+        for _, file_size, path in entries:
+            os.remove(path)
+            total -= file_size
+            if total <= max_bytes:
+                break
+    except OSError as e:
+        print(f"Error sweeping disk cache {directory}: {e}")
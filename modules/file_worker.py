@@ -0,0 +1,103 @@
+# modules/file_worker.py
+import os
+import time
+import shutil
+import concurrent.futures
+from PyQt6.QtCore import QThread, pyqtSignal
+
+PROGRESS_EMIT_INTERVAL = 1 / 30  # 進捗シグナルを送る最短間隔（秒）
+
+def copy_file(src, dst):
+    """src を dst にコピーする。dst が既にあれば FileExistsError（上書きしない）"""
+    created = False
+    try:
+        with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+            created = True  # ここから先で失敗したときだけ dst を消してよい
+            remaining = -1
+            if hasattr(os, "copy_file_range"):
+                # 同一ファイルシステムなら copy_file_range でカーネル内コピーする（Linux 等）
+                try:
+                    remaining = os.fstat(fsrc.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+                except OSError:
+                    remaining = -1
+        if remaining == 0:
+            shutil.copystat(src, dst)
+        else:
+            # 自分で作ったファイルなので上書きしてよい
+            # （Windows の Python 3.12 以降は CopyFile2、Linux は sendfile でコピーされる）
+            shutil.copy2(src, dst)
+    except BaseException:
+        if created:
+            try:
+                os.remove(dst)  # 途中まで書いたファイルを残さない
+            except OSError:
+                pass
+        raise
+
+def find_empty_folders(folder):
+    """folder 以下の空フォルダ（folder 自身は除く）を返す"""
+    # os.walk が列挙したサブフォルダとファイルの一覧で判定できるので、フォルダを読み直さない
+    empty_folders = []
+    for root, dirs, files in os.walk(folder):
+        if not dirs and not files and os.path.normpath(root) != os.path.normpath(folder):
+            empty_folders.append(root)
+    return empty_folders
+
+class EmptyFolderScanner(QThread):
+    finished_scan = pyqtSignal(list)  # empty folder paths
+
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = folder
+
+    def run(self):
+        try:
+            empty_folders = find_empty_folders(self.folder)
+        except Exception as e:
+            print(f"Error scanning empty folders: {e}")
+            empty_folders = []
+        self.finished_scan.emit(empty_folders)
+
+class FileOperationWorker(QThread):
+    progress = pyqtSignal(int, int)  # (processed, total)
+    finished_operation = pyqtSignal(list, list)  # (completed (src, dst) pairs, error messages)
+
+    def __init__(self, pairs, operation, max_workers=4):
+        super().__init__()
+        self.pairs = list(pairs)
+        self.operation = operation  # "move" または "copy"
+        self.max_workers = max_workers
+
+    def process_pair(self, pair):
+        src, dst = pair
+        if self.operation == "move":
+            shutil.move(src, dst)  # 別ドライブへの移動は shutil がコピー＋削除で処理する
+        else:
+            copy_file(src, dst)
+        return pair
+
+    def run(self):
+        completed = []
+        errors = []
+        last_emit = time.monotonic()
+        # 移動・コピーは I/O 待ちが主なので少数のスレッドで並列に処理する
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.process_pair, pair): pair for pair in self.pairs}
+            for processed, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                src, dst = futures[future]
+                try:
+                    completed.append(future.result())
+                except Exception as e:
+                    verb = "moving" if self.operation == "move" else "copying"
+                    error_msg = f"Error {verb} {os.path.basename(src)} to {os.path.dirname(dst)}: {e}"
+                    print(error_msg)
+                    errors.append(error_msg)
+                if processed == len(self.pairs) or time.monotonic() - last_emit >= PROGRESS_EMIT_INTERVAL:
+                    last_emit = time.monotonic()
+                    self.progress.emit(processed, len(self.pairs))
+        self.finished_operation.emit(completed, errors)
@@ -0,0 +1,31 @@
+# modules/filter_worker.py
+import concurrent.futures
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class FilterWorker(QThread):
+    finished_filtering = pyqtSignal(list)  # matching image paths
+
+    def __init__(self, image_paths, metadata_cache, match, max_workers=8):
+        super().__init__()
+        self.image_paths = list(image_paths)
+        self.metadata_cache = metadata_cache
+        self.match = match
+        self.max_workers = max_workers
+
+    def search_text(self, image_path):
+        try:
+            return self.metadata_cache.get_search_text(image_path)
+        except OSError:
+            return None  # 存在しない画像はフィルタ対象外（キャッシュ側の stat で判定）
+
+    def run(self):
+        matches = []
+        try:
+            # メタデータの読み込みは I/O 待ちが主なのでスレッドで並列化する（順序は map が保持）
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for image_path, search_text in zip(self.image_paths, executor.map(self.search_text, self.image_paths)):
+                    if search_text is not None and self.match(search_text):
+                        matches.append(image_path)
+        except Exception as e:
+            print(f"Error in filter worker: {e}")
+        self.finished_filtering.emit(matches)
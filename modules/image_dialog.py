@@ -1,12 +1,13 @@
 # modules/image_dialog.py
-import json
+import math
 import os
 import re
 from PyQt6.QtWidgets import (QDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QTextBrowser, 
-                            QApplication, QScrollArea, QTabWidget, QTextEdit, QWidget,
+                            QApplication, QScrollArea, QTabWidget, QPlainTextEdit, QWidget,
                             QHBoxLayout)
-from PyQt6.QtGui import QPixmap, QTextCursor, QTextCharFormat, QColor
-from PyQt6.QtCore import Qt, pyqtSignal, QEvent
+from PyQt6.QtGui import QPixmap, QTextCursor, QTextCharFormat, QColor, QImageReader
+from PyQt6.QtCore import Qt, pyqtSignal, QEvent, QTimer
+from modules.metadata import metadata_from_json
 
 class TagTextBrowser(QTextBrowser):
     tagClicked = pyqtSignal(str)
@@ -212,7 +213,7 @@ class MetadataDialog(QDialog):
     def __init__(self, metadata, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Metadata")
-        self.metadata_dict = json.loads(metadata) if isinstance(metadata, str) else metadata
+        self.metadata_dict = metadata_from_json(metadata) if isinstance(metadata, str) else metadata
         
         # タブウィジェットの設定
         self.tab_widget = QTabWidget(self)
@@ -253,10 +254,10 @@ class MetadataDialog(QDialog):
         """Metadataタブの設定（通常のテキスト表示）"""
         layout = QVBoxLayout()
         
-        # テキストエリアの設定
-        self.metadata_positive_edit = QTextEdit(self)
-        self.metadata_negative_edit = QTextEdit(self)
-        self.metadata_others_edit = QTextEdit(self)
+        # テキストエリアの設定（プレーンテキストなのでリッチテキストのレイアウトを行わない QPlainTextEdit を使う）
+        self.metadata_positive_edit = QPlainTextEdit(self)
+        self.metadata_negative_edit = QPlainTextEdit(self)
+        self.metadata_others_edit = QPlainTextEdit(self)
         
         self.metadata_positive_edit.setPlainText(self.metadata_dict.get("positive_prompt", "No positive metadata"))
         self.metadata_negative_edit.setPlainText(self.metadata_dict.get("negative_prompt", "No negative metadata"))
@@ -378,7 +379,7 @@ class MetadataDialog(QDialog):
     def update_metadata(self, metadata):
         """メタデータを更新"""
         try:
-            self.metadata_dict = json.loads(metadata) if isinstance(metadata, str) else metadata
+            self.metadata_dict = metadata_from_json(metadata) if isinstance(metadata, str) else metadata
             # Metadataタブ
             self.metadata_positive_edit.setPlainText(self.metadata_dict.get("positive_prompt", "No positive metadata"))
             self.metadata_negative_edit.setPlainText(self.metadata_dict.get("negative_prompt", "No negative metadata"))
@@ -437,6 +438,12 @@ class ImageDialog(QDialog):
         
         self.layout.addLayout(self.tool_layout)
         
+        # ウィンドウのドラッグ中は縮小し直さず、サイズが落ち着いてから1回だけ行う
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(30)
+        self.resize_timer.timeout.connect(self.apply_seamless_resize)
+        
         if self.preview_mode == 'seamless':
             self.setup_seamless_mode(image_path)
         else:
@@ -470,10 +477,10 @@ class ImageDialog(QDialog):
 
     def load_image(self, image_path):
         self.image_path = image_path
-        self.pixmap = QPixmap(image_path)
         self.setWindowTitle(f"Full Image - {os.path.basename(image_path)}")
         
         if self.preview_mode == 'seamless':
+            self.load_scaled_pixmap(self.image_label.size())
             scaled_pixmap = self.pixmap.scaled(
                 self.image_label.size(),
                 Qt.AspectRatioMode.KeepAspectRatio,
@@ -481,9 +488,53 @@ class ImageDialog(QDialog):
             )
             self.image_label.setPixmap(scaled_pixmap)
         else:
+            self.load_wheel_pixmap()
             self.scale_factor = 1.0
             self.image_label.setPixmap(self.pixmap)
 
+    def load_scaled_pixmap(self, target_size):
+        """表示サイズを超える画像は縮小しながらデコードする（全画素を展開しない）"""
+        reader = QImageReader(self.image_path)
+        self.source_size = reader.size()
+        if self.source_size.isValid():
+            fit_size = self.source_size.scaled(target_size, Qt.AspectRatioMode.KeepAspectRatio)
+            if fit_size.width() < self.source_size.width():
+                reader.setScaledSize(fit_size)
+        self.pixmap = QPixmap.fromImageReader(reader)
+
+    def load_wheel_pixmap(self):
+        """ズーム用に読み込む。画面の2倍を超える画像はその大きさまで縮小してデコードする"""
+        reader = QImageReader(self.image_path)
+        source_size = reader.size()
+        screen = QApplication.primaryScreen()
+        if source_size.isValid() and screen is not None:
+            max_size = screen.size() * 2
+            if source_size.width() > max_size.width() or source_size.height() > max_size.height():
+                reader.setScaledSize(source_size.scaled(max_size, Qt.AspectRatioMode.KeepAspectRatio))
+        self.pixmap = QPixmap.fromImageReader(reader)
+        self.zoom_levels = [self.pixmap]  # 縦横半分ずつ縮小した画像（縮小表示の元にする）
+
+    def zoom_source(self, scale_factor):
+        # 縮小表示では目標サイズ以上で最も小さい段から縮小し、元画像全体を毎回縮小し直さない
+        level = max(0, int(-math.log2(scale_factor))) if scale_factor < 1 else 0
+        while len(self.zoom_levels) <= level:
+            last = self.zoom_levels[-1]
+            if last.width() < 2 or last.height() < 2:
+                break
+            self.zoom_levels.append(last.scaled(
+                last.size() / 2,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+        return self.zoom_levels[min(level, len(self.zoom_levels) - 1)]
+
+    def needs_reload(self, target_size):
+        # 縮小デコード済みの画像より大きく表示する場合のみ読み直す
+        if not self.source_size.isValid() or self.pixmap.width() >= self.source_size.width():
+            return False
+        fit_size = self.source_size.scaled(target_size, Qt.AspectRatioMode.KeepAspectRatio)
+        return fit_size.width() > self.pixmap.width()
+
     def update_navigation_buttons(self):
         self.prev_button.setEnabled(self.current_index > 0)
         self.next_button.setEnabled(self.current_index < len(self.all_images) - 1)
@@ -491,7 +542,7 @@ class ImageDialog(QDialog):
 
     def setup_seamless_mode(self, image_path):
         self.image_label = QLabel(self)
-        self.pixmap = QPixmap(image_path)
+        self.load_scaled_pixmap(self.size())
         scaled_pixmap = self.pixmap.scaled(
             self.size(),
             Qt.AspectRatioMode.KeepAspectRatio,
@@ -505,7 +556,7 @@ class ImageDialog(QDialog):
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
         self.image_label = QLabel()
-        self.pixmap = QPixmap(image_path)
+        self.load_wheel_pixmap()
         self.image_label.setPixmap(self.pixmap)
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.scroll_area.setWidget(self.image_label)
@@ -522,7 +573,7 @@ class ImageDialog(QDialog):
                     self.scale_factor *= 1.1
                 else:
                     self.scale_factor *= 0.9
-                scaled_pixmap = self.pixmap.scaled(
+                scaled_pixmap = self.zoom_source(self.scale_factor).scaled(
                     self.pixmap.size() * self.scale_factor,
                     Qt.AspectRatioMode.KeepAspectRatio,
                     Qt.TransformationMode.SmoothTransformation
@@ -557,15 +608,20 @@ class ImageDialog(QDialog):
 
     def resizeEvent(self, event):
         if self.preview_mode == 'seamless':
-            new_pixmap = self.pixmap.scaled(
-                self.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(new_pixmap)
+            self.resize_timer.start()
         else:
             super().resizeEvent(event)
 
+    def apply_seamless_resize(self):
+        if self.needs_reload(self.size()):
+            self.load_scaled_pixmap(self.size())
+        new_pixmap = self.pixmap.scaled(
+            self.size(),
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        self.image_label.setPixmap(new_pixmap)
+
     def toggle_maximize(self):
         if self.windowState() != Qt.WindowState.WindowMaximized:
             if self.saved_geometry is None:
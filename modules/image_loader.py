@@ -1,62 +1,135 @@
 # modules/image_loader.py
+import os
+import time
+import multiprocessing
 import concurrent.futures
-from pathlib import Path
+from concurrent.futures.process import BrokenProcessPool
 from PyQt6.QtCore import QThread, pyqtSignal
+from modules.thumbnail_cache import decode_thumbnail_pixels
+
+IMAGE_EXTENSIONS = ('.png', '.jpeg', '.jpg', '.webp')
+EXTENSION_TAIL = max(map(len, IMAGE_EXTENSIONS))  # 拡張子の判定に必要な末尾の文字数
+PROGRESS_EMIT_INTERVAL = 1 / 30  # スレッド間シグナルを送る最短間隔（秒）
+PROCESS_POOL_WORKERS = min(os.cpu_count() or 1, 8)
+# 画像フォルダに紛れ込みがちなキャッシュ類。"." で始まるフォルダも辿らない
+SKIP_DIRS = {'__pycache__', '__MACOSX', '$RECYCLE.BIN', 'System Volume Information'}
+
+def create_process_pool():
+    """サムネイルのデコード用のプロセスプール（ワーカーは最初にデコードが必要になった時点で起動される）"""
+    # Qt のスレッドを抱えたまま fork しないよう、どの OS でも spawn で起動する
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=PROCESS_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def is_image_name(name):
+    # ファイル名全体ではなく末尾の数文字だけを小文字化して比較する
+    return name[-EXTENSION_TAIL:].lower().endswith(IMAGE_EXTENSIONS)
+
+def walk_images(folder):
+    """folder 以下の画像の os.DirEntry を返す"""
+    # os.scandir はエントリ種別をキャッシュしているため、ファイルごとの stat が不要
+    # 再帰ジェネレーターではなくスタックで辿り、深い階層でも呼び出しが重ならないようにする
+    stack = [folder]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                            stack.append(entry.path)
+                    elif is_image_name(entry.name) and entry.is_file():
+                        yield entry
+        except OSError as e:
+            print(f"Cannot scan {directory}: {e}")  # 読めないフォルダは飛ばして続行
 
 class ImageLoader(QThread):
     update_progress = pyqtSignal(int, int)    # (loaded, total)
-    update_thumbnail = pyqtSignal(str, int)   # (image_path, index)
-    finished_loading = pyqtSignal(list)       # image paths list
+    update_thumbnails = pyqtSignal(list)      # image paths loaded since the last emit
+    finished_loading = pyqtSignal(list, dict) # (image paths list, image path -> mtime)
 
-    def __init__(self, folder, thumbnail_cache, thumbnail_size=200):
+    def __init__(self, folder, thumbnail_cache, thumbnail_size=200, metadata_cache=None, process_pool=None):
         super().__init__()
         self.folder = folder
+        # 縮小処理は CPU 負荷が高いので、キャッシュに無い画像のデコードだけ別プロセスで行う
+        # プロセスの起動は重いため、プールは呼び出し側で作って読み込みのたびに使い回す
+        self.process_pool = process_pool
+        self.pool_broken = False  # プールが使えなくなったら呼び出し側で作り直す
         self.thumbnail_cache = thumbnail_cache
+        self.metadata_cache = metadata_cache
         self.thumbnail_size = thumbnail_size
         self.images = []
+        self.mtimes = {}  # 日付順の並べ替え用（Windows ではフォルダの列挙結果から stat なしで得られる）
         self.total_files = 0
         self._is_running = True
-        self.valid_extensions = {'.png', '.jpeg', '.jpg', '.webp'}
 
     def stop(self):
         self._is_running = False
         self.wait()
 
-    def is_valid_image(self, file_path):
-        return Path(file_path).suffix.lower() in self.valid_extensions
-
     def run(self):
         try:
-            self.total_files = sum(1 for f in Path(self.folder).rglob('*')
-                                   if self.is_valid_image(f))
-            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-                future_to_path = {
-                    executor.submit(self.process_image, str(f)): str(f)
-                    for f in Path(self.folder).rglob('*') if self.is_valid_image(f)
-                }
+            # プロセスを遊ばせないよう、投入側のスレッドもプロセス数以上用意する
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(4, PROCESS_POOL_WORKERS)) as executor:
+                # フォルダを辿りながら投入し、走査が終わる前からデコードを始める
+                future_to_path = {}
+                last_emit = time.monotonic()
+                for entry in walk_images(os.path.normpath(self.folder)):
+                    if not self._is_running:
+                        break
+                    path = entry.path
+                    try:
+                        self.mtimes[path] = entry.stat().st_mtime
+                    except OSError:
+                        pass
+                    future_to_path[executor.submit(self.process_image, path)] = path
+                    if time.monotonic() - last_emit >= PROGRESS_EMIT_INTERVAL:
+                        last_emit = time.monotonic()
+                        self.update_progress.emit(0, len(future_to_path))
+                self.total_files = len(future_to_path)
+                # 読み込めた画像は一定間隔でまとめて GUI スレッドへ渡す
+                batch = []
                 for i, future in enumerate(concurrent.futures.as_completed(future_to_path)):
                     if not self._is_running:
+                        executor.shutdown(wait=False, cancel_futures=True)  # 未着手の画像は処理しない
                         break
                     path = future_to_path[future]
                     try:
                         if future.result():
                             self.images.append(path)
-                            self.update_thumbnail.emit(path, i)
+                            batch.append(path)
                     except Exception as e:
                         print(f"Error processing {path}: {e}")
-                    self.update_progress.emit(i + 1, self.total_files)
+                    loaded = i + 1
+                    if loaded == self.total_files or time.monotonic() - last_emit >= PROGRESS_EMIT_INTERVAL:
+                        last_emit = time.monotonic()
+                        if batch:
+                            self.update_thumbnails.emit(batch)
+                            batch = []
+                        self.update_progress.emit(loaded, self.total_files)
             if self._is_running:
-                self.finished_loading.emit(self.images)
+                self.finished_loading.emit(self.images, self.mtimes)
         except Exception as e:
             print(f"Error in image loader: {e}")
 
+    def decode_in_process(self, image_path, size):
+        try:
+            return self.process_pool.submit(decode_thumbnail_pixels, image_path, size).result()
+        except BrokenProcessPool:
+            self.pool_broken = True
+            return decode_thumbnail_pixels(image_path, size)  # プロセスが使えない環境ではこのスレッドで処理する
+
     def process_image(self, image_path):
         try:
-            cache_key = f"{image_path}_{self.thumbnail_size}"
-            if cache_key in self.thumbnail_cache.cache:
-                return True
-            self.thumbnail_cache.get_thumbnail(image_path, self.thumbnail_size)
-            return True
+            if not self.thumbnail_cache.contains(image_path, self.thumbnail_size):
+                decoder = self.decode_in_process if self.process_pool is not None else None
+                self.thumbnail_cache.get_qimage(image_path, self.thumbnail_size, decoder)
         except Exception as e:
             print(f"Error processing image {image_path}: {e}")
             return False
+        # フィルタ用にメタデータも並列で読み込んでおく
+        if self.metadata_cache is not None:
+            try:
+                self.metadata_cache.get_metadata(image_path)
+            except Exception as e:
+                print(f"Error extracting metadata {image_path}: {e}")
+        return True
@@ -0,0 +1,44 @@
+# modules/keyword_filter.py
+import re
+
+try:
+    # pyahocorasick があれば複数キーワードを1回の走査で検索する（任意）
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
+def split_terms(query):
+    """カンマ区切りの検索語を小文字化して重複なく取り出す"""
+    return list(dict.fromkeys(term for term in (part.strip().lower() for part in query.split(",")) if term))
+
+def build_matcher(terms, match_all):
+    """小文字化済みのテキストを受け取り、条件に一致するかを返す関数を作る"""
+    terms = list(dict.fromkeys(term.lower() for term in terms if term))
+    if not terms:
+        return lambda text: match_all
+    if len(terms) == 1:
+        term = terms[0]  # 1語だけなら AND/OR に関係なく単純な部分一致で十分
+        return lambda text: term in text
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for i, term in enumerate(terms):
+            automaton.add_word(term, i)
+        automaton.make_automaton()
+        if match_all:
+            def match(text):
+                found = set()
+                for _, i in automaton.iter(text):
+                    found.add(i)
+                    if len(found) == len(terms):
+                        return True
+                return False
+        else:
+            def match(text):
+                for _ in automaton.iter(text):
+                    return True
+                return False
+        return match
+    if match_all:
+        return lambda text: all(term in text for term in terms)
+    pattern = re.compile("|".join(map(re.escape, terms)))
+    return lambda text: pattern.search(text) is not None
@@ -1,23 +1,78 @@
 # modules/metadata.py
+import functools
 import json
+import re
+import struct
+import zlib
 from PIL import Image
 
+try:
+    # orjson があれば JSON の読み書きに使う（任意）
+    import orjson
+except Exception:
+    orjson = None
+
+EXIF_IFD_POINTER = 0x8769
+USER_COMMENT_TAG = 0x9286
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_HEADER_READ_SIZE = 64 * 1024  # IDAT までのチャンクは通常この範囲に収まる
+
+def _utf16_codec(data):
+    # UNICODE の UserComment は書き込むソフトによってバイト順が異なる
+    # BOM が無ければ、ASCII 文字の上位バイト(0)が偶数・奇数どちらの位置に多いかで判定する
+    if data[:2] in (b'\xfe\xff', b'\xff\xfe'):
+        return 'utf-16'
+    sample = data[:256]
+    if sample[1::2].count(0) > sample[0::2].count(0):
+        return 'utf-16-le'
+    return 'utf-16-be'
+
 def decode_exif(exif_data):
+    if isinstance(exif_data, (bytearray, memoryview)):
+        exif_data = bytes(exif_data)  # バイト列として C 側で一括デコードする
     if isinstance(exif_data, bytes):
         try:
-            unicode_start = exif_data.find(b'UNICODE\x00\x00')
+            unicode_start = exif_data.find(b'UNICODE\x00')  # 文字コード識別子は8バイト
             if unicode_start != -1:
                 data = exif_data[unicode_start + 8:]
-                try:
-                    return data.decode('utf-16-be')
-                except UnicodeDecodeError:
-                    return data.decode('utf-16-le')
+                return data.decode(_utf16_codec(data), errors='ignore').rstrip('\x00')
+            elif exif_data.startswith(b'ASCII\x00\x00\x00'):
+                # UserComment の文字コード識別子(8バイト)を除いて一括デコード
+                return exif_data[8:].decode('utf-8', errors='ignore').rstrip('\x00')
             else:
                 return exif_data.decode('utf-8', errors='ignore')
         except Exception as e:
             return f"Decode error: {str(e)}"
     return str(exif_data)
 
+NEG_MARKERS = ('Negative prompt:', 'negative_prompt:', 'neg_prompt:')
+INFO_MARKERS = ('Steps:', 'Model:', 'Size:', 'Seed:')
+INFO_MARKER_RE = re.compile('|'.join(map(re.escape, INFO_MARKERS)))  # 最も手前の生成情報を1回の走査で探す
+
+@functools.lru_cache(maxsize=4096)
+def _split_parameters(text):
+    # 生成画像は同じプロンプトが多いため、分割結果をキャッシュする
+    neg_prompt_start = -1
+    neg_length = 0
+    for marker in NEG_MARKERS:
+        pos = text.find(marker)
+        if pos != -1:
+            neg_prompt_start = pos
+            neg_length = len(marker)
+            break
+    info_match = INFO_MARKER_RE.search(text)
+    steps_start = info_match.start() if info_match else -1
+    if neg_prompt_start != -1:
+        positive = text[:neg_prompt_start].strip()
+        if steps_start != -1:
+            return (positive,
+                    text[neg_prompt_start + neg_length:steps_start].strip(),
+                    text[steps_start:].strip())
+        return positive, text[neg_prompt_start:].strip(), ''
+    if steps_start != -1:
+        return text[:steps_start].strip(), '', text[steps_start:].strip()
+    return text.strip(), '', ''
+
 def parse_parameters(text):
     params = {
         'positive_prompt': '',
@@ -25,67 +80,207 @@ def parse_parameters(text):
         'generation_info': ''
     }
     try:
-        neg_markers = ['Negative prompt:', 'negative_prompt:', 'neg_prompt:']
-        neg_prompt_start = -1
-        for marker in neg_markers:
-            pos = text.find(marker)
-            if pos != -1:
-                neg_prompt_start = pos
+        positive, negative, info = _split_parameters(text)
+        params['positive_prompt'] = positive
+        params['negative_prompt'] = negative
+        params['generation_info'] = info
+    except Exception as e:
+        print(f"Error parsing parameters: {e}")
+    return params
+
+def _find_ifd_entry(tiff, ifd_offset, tag, endian):
+    # IFD を走査して指定タグの (type, count, value_field_offset) を返す
+    entry_count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(entry_count):
+        entry = ifd_offset + 2 + i * 12
+        entry_tag, entry_type, count = struct.unpack(endian + 'HHI', tiff[entry:entry + 8])
+        if entry_tag == tag:
+            return entry_type, count, entry + 8
+    return None
+
+def _tiff_user_comment(tiff):
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+    ifd0_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    pointer = _find_ifd_entry(tiff, ifd0_offset, EXIF_IFD_POINTER, endian)
+    if pointer is None:
+        return None
+    exif_ifd_offset = struct.unpack(endian + 'I', tiff[pointer[2]:pointer[2] + 4])[0]
+    comment = _find_ifd_entry(tiff, exif_ifd_offset, USER_COMMENT_TAG, endian)
+    if comment is None:
+        return None
+    _, count, value_field = comment
+    if count <= 4:
+        value_offset = value_field
+    else:
+        value_offset = struct.unpack(endian + 'I', tiff[value_field:value_field + 4])[0]
+    return tiff[value_offset:value_offset + count]
+
+def _fast_exif_user_comment(image_path):
+    # JPEG の APP1(Exif) セグメントだけを読み、UserComment を直接取り出す
+    with open(image_path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF:
+                return None
+            marker = header[1]
+            if marker in (0xD9, 0xDA):  # EOI / SOS 以降にメタデータは無い
+                return None
+            length = struct.unpack('>H', header[2:4])[0]
+            if marker == 0xE1:
+                segment = f.read(length - 2)
+                if segment[:6] == b'Exif\x00\x00':
+                    return _tiff_user_comment(segment[6:])
+            else:
+                f.seek(length - 2, 1)
+
+def _webp_exif_user_comment(image_path):
+    # RIFF チャンクを辿って EXIF チャンクだけを読む（VP8 等の画素データは読み飛ばす）
+    with open(image_path, 'rb') as f:
+        header = f.read(12)
+        if header[:4] != b'RIFF' or header[8:12] != b'WEBP':
+            return None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_type, length = struct.unpack('<4sI', chunk_header)
+            if chunk_type == b'EXIF':
+                data = f.read(length)
+                if data[:6] == b'Exif\x00\x00':
+                    data = data[6:]
+                return _tiff_user_comment(data)
+            f.seek(length + (length & 1), 1)  # チャンクは偶数バイト境界に揃えられている
+
+def _png_text_chunks(image_path):
+    # IDAT より前にある tEXt / zTXt / iTXt / eXIf チャンクだけを読む（画素はデコードしない）
+    texts = {}
+    # 先頭をまとめて読み込み、チャンク間の seek はバッファ内で済ませる
+    with open(image_path, 'rb', buffering=PNG_HEADER_READ_SIZE) as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type in (b'IDAT', b'IEND'):
                 break
-        info_markers = ['Steps:', 'Model:', 'Size:', 'Seed:']
-        steps_start = -1
-        for marker in info_markers:
-            pos = text.find(marker)
-            if pos != -1 and (steps_start == -1 or pos < steps_start):
-                steps_start = pos
-        if neg_prompt_start != -1:
-            params['positive_prompt'] = text[:neg_prompt_start].strip()
-            if steps_start != -1:
-                marker_found = [m for m in neg_markers if text[neg_prompt_start:].startswith(m)]
-                if marker_found:
-                    neg_length = len(marker_found[0])
-                    params['negative_prompt'] = text[neg_prompt_start + neg_length:steps_start].strip()
-                    params['generation_info'] = text[steps_start:].strip()
-                else:
-                    params['negative_prompt'] = text[neg_prompt_start:].strip()
+            if chunk_type not in (b'tEXt', b'zTXt', b'iTXt', b'eXIf'):
+                f.seek(length + 4, 1)  # データ + CRC を読み飛ばす
+                continue
+            data = f.read(length)
+            f.seek(4, 1)
+            if chunk_type == b'eXIf':
+                if data[:6] == b'Exif\x00\x00':
+                    data = data[6:]
+                user_comment = _tiff_user_comment(data)
+                if user_comment:
+                    texts['exif'] = user_comment
+                continue
+            key, _, body = data.partition(b'\x00')
+            key = key.decode('latin-1')
+            if chunk_type == b'tEXt':
+                texts[key] = body.decode('latin-1')
+            elif chunk_type == b'zTXt':
+                texts[key] = zlib.decompress(body[1:]).decode('latin-1')
             else:
-                params['negative_prompt'] = text[neg_prompt_start:].strip()
-        else:
-            if steps_start != -1:
-                params['positive_prompt'] = text[:steps_start].strip()
-                params['generation_info'] = text[steps_start:].strip()
+                compressed = body[0] == 1
+                _, _, rest = body[2:].partition(b'\x00')  # language tag
+                _, _, text = rest.partition(b'\x00')      # translated keyword
+                if compressed:
+                    text = zlib.decompress(text)
+                texts[key] = text.decode('utf-8')
+    return texts
+
+def _build_metadata(info):
+    metadata = {}
+    for key, value in info.items():
+        try:
+            if key == 'exif':
+                metadata[key] = decode_exif(value)
+            elif key == 'parameters':
+                metadata[key] = value
+            elif isinstance(value, str):
+                try:
+                    json_value = orjson.loads(value) if orjson is not None else json.loads(value)
+                    metadata[key] = json_value
+                except Exception:
+                    metadata[key] = value
             else:
-                params['positive_prompt'] = text.strip()
+                metadata[key] = value
+        except Exception as e:
+            metadata[key] = f"Error parsing {key}: {str(e)}"
+    params = {'positive_prompt': '', 'negative_prompt': '', 'generation_info': ''}
+    if 'parameters' in metadata:
+        params = parse_parameters(metadata['parameters'])
+    elif 'exif' in metadata:
+        params = parse_parameters(metadata['exif'])
+    metadata.update(params)
+    return metadata
+
+def extract_metadata_dict(image_path):
+    try:
+        info = None
+        lower_path = image_path.lower()
+        if lower_path.endswith(('.jpg', '.jpeg', '.webp')):
+            reader = _webp_exif_user_comment if lower_path.endswith('.webp') else _fast_exif_user_comment
+            try:
+                user_comment = reader(image_path)
+            except Exception:
+                user_comment = None
+            if user_comment:
+                info = {'exif': user_comment}
+        elif lower_path.endswith('.png'):
+            try:
+                info = _png_text_chunks(image_path)
+            except Exception:
+                info = None
+        # 直接読み取れなかった場合のみ PIL で開く
+        # ヘッダーの info だけを参照し、load() / copy() で画素をデコードしないこと
+        if info is None:
+            with Image.open(image_path) as img:
+                info = dict(img.info)
+                if isinstance(info.get('exif'), bytes):
+                    # EXIF ブロック全体ではなく、Exif IFD の UserComment だけを取り出す
+                    user_comment = img.getexif().get_ifd(EXIF_IFD_POINTER).get(USER_COMMENT_TAG)
+                    if user_comment:
+                        info['exif'] = user_comment
+        return _build_metadata(info)
     except Exception as e:
-        print(f"Error parsing parameters: {e}")
-    return params
+        return {"error": str(e)}
 
-def extract_metadata(image_path):
+def metadata_to_json(metadata):
+    if orjson is not None:
+        try:
+            return orjson.dumps(metadata, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            pass  # orjson が扱えない値（str 以外のキーなど）は標準の json に任せる
+    # orjson の有無で表示・コピーされる形式が変わらないよう、インデントと非 ASCII 文字の扱いを orjson に揃える
     try:
-        with Image.open(image_path) as img:
-            metadata = {}
-            for key, value in img.info.items():
-                try:
-                    if key == 'exif':
-                        metadata[key] = decode_exif(value)
-                    elif key == 'parameters':
-                        metadata[key] = value
-                    elif isinstance(value, str):
-                        try:
-                            json_value = json.loads(value)
-                            metadata[key] = json_value
-                        except Exception:
-                            metadata[key] = value
-                    else:
-                        metadata[key] = value
-                except Exception as e:
-                    metadata[key] = f"Error parsing {key}: {str(e)}"
-            params = {'positive_prompt': '', 'negative_prompt': '', 'generation_info': ''}
-            if 'parameters' in metadata:
-                params = parse_parameters(metadata['parameters'])
-            elif 'exif' in metadata:
-                params = parse_parameters(metadata['exif'])
-            metadata.update(params)
-            return json.dumps(metadata, indent=4)
+        return json.dumps(metadata, indent=2, ensure_ascii=False)
     except Exception as e:
-        return json.dumps({"error": str(e)}, indent=4)
+        return json.dumps({"error": str(e)}, indent=2, ensure_ascii=False)
+
+def metadata_from_json(metadata_json):
+    """metadata_to_json で作った文字列を辞書に戻す"""
+    if orjson is not None:
+        return orjson.loads(metadata_json)
+    return json.loads(metadata_json)
+
+def metadata_search_text(metadata):
+    # JSON 文字列ではなく元の文字列を連結する（日本語が \uXXXX にエスケープされず検索できる）
+    parts = []
+    for key, value in metadata.items():
+        parts.append(key)
+        parts.append(value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str))
+    return "\n".join(parts).lower()
+
+def extract_metadata(image_path):
+    return metadata_to_json(extract_metadata_dict(image_path))
@@ -0,0 +1,105 @@
+# modules/metadata_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from modules.disk_cache import sweep_disk_cache
+from modules.metadata import extract_metadata_dict, metadata_to_json, metadata_search_text
+
+try:
+    # orjson があればディスクキャッシュの読み書きに使う（任意）
+    import orjson
+except Exception:
+    orjson = None
+
+MAX_METADATA_ENTRIES = 20000
+DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ImageMover", "meta")
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+class MetadataCache:
+    def __init__(self, max_entries=MAX_METADATA_ENTRIES):
+        self.cache = OrderedDict()  # image_path -> ((mtime_ns, size), metadata_json, search_text)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.disk_cache_dir = DISK_CACHE_DIR
+        try:
+            os.makedirs(self.disk_cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Disk metadata cache disabled: {e}")
+            self.disk_cache_dir = None
+
+    def disk_cache_path(self, image_path, stamp):
+        # サムネイルのディスクキャッシュと同じく、更新日時とファイルサイズをキーに含める
+        key = hashlib.blake2b(f"{image_path}|{stamp[0]}|{stamp[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_cache_dir, f"{key}.json")
+
+    def load_metadata(self, image_path, stamp):
+        if self.disk_cache_dir is None:
+            return extract_metadata_dict(image_path)
+        cache_path = self.disk_cache_path(image_path, stamp)
+        try:
+            if orjson is not None:
+                with open(cache_path, "rb") as f:
+                    metadata = orjson.loads(f.read())
+            else:
+                with open(cache_path, encoding="utf-8") as f:
+                    metadata = json.load(f)
+            try:
+                os.utime(cache_path)  # 使った順に掃除できるよう更新日時を使用日時として記録する
+            except OSError:
+                pass
+            return metadata
+        except (OSError, ValueError):
+            pass
+        metadata = extract_metadata_dict(image_path)
+        if "error" not in metadata:  # 読めなかった結果は次回もう一度試す
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            try:
+                if orjson is not None:
+                    with open(tmp_path, "wb") as f:
+                        f.write(orjson.dumps(metadata))
+                else:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(metadata, f, ensure_ascii=False)
+                os.replace(tmp_path, cache_path)
+            except (OSError, TypeError, ValueError):
+                # JSON にできない値（PIL の info に含まれるバイト列など）はメモリ上だけで持つ
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        return metadata
+
+    def get_entry(self, image_path):
+        # ファイルが更新されていれば読み直す（更新日時とサイズで判定）
+        st = os.stat(image_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.cache.get(image_path)
+            if entry and entry[0] == stamp:
+                self.cache.move_to_end(image_path)
+                return entry
+        metadata = self.load_metadata(image_path, stamp)
+        entry = (stamp, metadata_to_json(metadata), metadata_search_text(metadata))  # 検索用に小文字化しておく
+        with self.lock:
+            self.cache[image_path] = entry
+            self.cache.move_to_end(image_path)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)  # 最も長く使われていないものから捨てる
+        return entry
+
+    def get_metadata(self, image_path):
+        return self.get_entry(image_path)[1]
+
+    def get_search_text(self, image_path):
+        return self.get_entry(image_path)[2]
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+    def sweep_disk_cache(self, max_bytes=DISK_CACHE_MAX_BYTES):
+        if self.disk_cache_dir is None:
+            return
+        sweep_disk_cache(self.disk_cache_dir, max_bytes)
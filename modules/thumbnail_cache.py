@@ -1,35 +1,167 @@
 # modules/thumbnail_cache.py
+import os
+import hashlib
 import threading
-from PyQt6.QtGui import QImage, QPixmap
-from PyQt6.QtCore import Qt
+from concurrent.futures import Future
+from collections import OrderedDict
+from PIL import Image
+from PyQt6.QtGui import QImage, QImageWriter
+from modules.disk_cache import sweep_disk_cache
+
+try:
+    # libvips があれば shrink-on-load で高速にサムネイルを作成する（任意）
+    import pyvips
+except Exception:
+    pyvips = None
+
+DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ImageMover", "thumbs")
+DISK_CACHE_QUALITY = 80
+DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Image.Resampling は Pillow 9.1 以降。古い pillow-simd でも動くよう定数を直接参照しない
+LANCZOS = getattr(Image, "Resampling", Image).LANCZOS
+# 目標サイズ付近までは整数倍の平均化(reduce)で一気に縮め、LANCZOS は最後のわずかな縮小だけに使う
+THUMBNAIL_REDUCING_GAP = 1.0
+
+def decode_thumbnail_pixels(image_path, size):
+    """縮小した画素の生データを (幅, 高さ, "RGB" または "RGBA", bytes) で返す
+    （別プロセスからも呼べるよう Qt を使わない）"""
+    if pyvips is not None:
+        try:
+            return _decode_thumbnail_pixels_vips(image_path, size)
+        except Exception:
+            pass  # libvips が対応していない形式は PIL で処理する
+    with Image.open(image_path) as img:
+        # JPEG は DCT 段階で縮小デコードさせ、最終的な縮小は LANCZOS で行う
+        img.draft("RGB", (size * 2, size * 2))
+        img.thumbnail((size, size), LANCZOS, reducing_gap=THUMBNAIL_REDUCING_GAP)
+        # 透過の無い画像は RGB のまま渡し、変換とプロセス間で送るデータ量を減らす
+        mode = "RGBA" if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info else "RGB"
+        if img.mode != mode:
+            img = img.convert(mode)
+        return img.width, img.height, mode, img.tobytes("raw", mode)
+
+def _decode_thumbnail_pixels_vips(image_path, size):
+    vimg = pyvips.Image.thumbnail(image_path, size, height=size)
+    if vimg.interpretation != "srgb":
+        vimg = vimg.colourspace("srgb")
+    if vimg.format != "uchar":
+        vimg = vimg.cast("uchar")
+    mode = "RGBA" if vimg.hasalpha() else "RGB"
+    return vimg.width, vimg.height, mode, vimg.write_to_memory()
 
 class ThumbnailCache:
     def __init__(self, max_size=1000):
-        self.cache = {}
+        self.cache = OrderedDict()  # (image_path, size) -> QImage（最近使った順）
         self.max_size = max_size
         self.lock = threading.Lock()
+        self.pending = {}  # (image_path, size) -> 作成中の Future（同じ画像を二重にデコードしない）
+        self.disk_cache_dir = DISK_CACHE_DIR
+        try:
+            os.makedirs(self.disk_cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Disk thumbnail cache disabled: {e}")
+            self.disk_cache_dir = None
+        # WebP が書ければ PNG より小さく読み込みも速いのでそちらを使う
+        self.disk_cache_format = "webp" if b"webp" in QImageWriter.supportedImageFormats() else "png"
+
+    def disk_cache_path(self, image_path, size):
+        # 元画像の更新日時とファイルサイズをキーに含め、変更されたら作り直す
+        st = os.stat(image_path)
+        key = hashlib.blake2b(f"{image_path}|{st.st_mtime_ns}|{st.st_size}|{size}".encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_cache_dir, f"{key}.{self.disk_cache_format}")
+
+    def load_or_create(self, image_path, size, decoder=None):
+        if self.disk_cache_dir is None:
+            return self.decode_thumbnail(image_path, size, decoder)
+        cache_path = self.disk_cache_path(image_path, size)
+        if os.path.exists(cache_path):
+            image = QImage(cache_path)
+            if not image.isNull():
+                try:
+                    os.utime(cache_path)  # 使った順に掃除できるよう更新日時を使用日時として記録する
+                except OSError:
+                    pass
+                return image
+        image = self.decode_thumbnail(image_path, size, decoder)
+        tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            if not image.save(tmp_path, self.disk_cache_format.upper(), DISK_CACHE_QUALITY):
+                raise OSError(f"cannot write {tmp_path}")
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # ディスクに書けなくても作成したサムネイルはそのまま使う（書きかけのファイルは残さない）
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return image
 
-    def get_thumbnail(self, image_path, size):
-        cache_key = f"{image_path}_{size}"
+    def contains(self, image_path, size):
+        # 読み込み時の確認も「使用」として扱い、表示中のフォルダの画像が先に捨てられないようにする
         with self.lock:
-            if cache_key in self.cache:
-                return self.cache[cache_key]
+            if (image_path, size) in self.cache:
+                self.cache.move_to_end((image_path, size))
+                return True
+            return False
+
+    def get_qimage(self, image_path, size, decoder=None):
+        # ワーカースレッドから呼ばれるため QPixmap は作らず QImage を返す
+        # decoder を渡すとデコードだけを別の実行器（プロセスプールなど）に任せられる
+        cache_key = (image_path, size)
+        with self.lock:
+            image = self.cache.get(cache_key)
+            if image is not None:
+                self.cache.move_to_end(cache_key)
+                return image
+            future = self.pending.get(cache_key)
+            owner = future is None
+            if owner:
+                future = self.pending[cache_key] = Future()
+        if not owner:
+            return future.result()  # 他のスレッドが作成中なので、その結果を待つ
+        image = None
         try:
-            image = QImage(image_path)
-            pixmap = QPixmap.fromImage(image).scaled(
-                size, size,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            with self.lock:
-                if len(self.cache) >= self.max_size:
-                    oldest_key = next(iter(self.cache))
-                    del self.cache[oldest_key]
-                self.cache[cache_key] = pixmap
-            return pixmap
+            image = self.prepare_for_display(self.load_or_create(image_path, size, decoder))
         except Exception as e:
             print(f"Error creating thumbnail for {image_path}: {e}")
-            return None
+        with self.lock:
+            if image is not None:
+                self.cache[cache_key] = image
+                self.cache.move_to_end(cache_key)
+                while len(self.cache) > self.max_size:
+                    self.cache.popitem(last=False)  # 最も長く使われていないものから捨てる
+            del self.pending[cache_key]
+        future.set_result(image)
+        return image
+
+    @staticmethod
+    def prepare_for_display(image):
+        # 画面表示用の形式にワーカー側で変換しておき、GUI スレッドの QPixmap.fromImage を軽くする
+        if image.hasAlphaChannel():
+            return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+        return image.convertToFormat(QImage.Format.Format_RGB32)
+
+    def find_qimage(self, image_path, size):
+        # デコードはせず、メモリ上にある QImage だけを返す
+        with self.lock:
+            image = self.cache.get((image_path, size))
+            if image is not None:
+                self.cache.move_to_end((image_path, size))
+        return image
+
+    @staticmethod
+    def decode_thumbnail(image_path, size, decoder=None):
+        width, height, mode, data = (decoder or decode_thumbnail_pixels)(image_path, size)
+        if mode == "RGBA":
+            image = QImage(data, width, height, width * 4, QImage.Format.Format_RGBA8888)
+        else:
+            image = QImage(data, width, height, width * 3, QImage.Format.Format_RGB888)
+        return image.copy()  # data の寿命から切り離す
+
+    def sweep_disk_cache(self, max_bytes=DISK_CACHE_MAX_BYTES):
+        if self.disk_cache_dir is None:
+            return
+        sweep_disk_cache(self.disk_cache_dir, max_bytes)
 
     def clear(self):
         with self.lock:
@@ -39,4 +171,4 @@ class ThumbnailCache:
         with self.lock:
             self.max_size = new_max_size
             while len(self.cache) > self.max_size:
-                self.cache.pop(next(iter(self.cache)))
+                self.cache.popitem(last=False)
@@ -1,79 +1,262 @@
 # modules/thumbnail_widget.py
 import os
-from PyQt6.QtWidgets import QLabel
-from PyQt6.QtCore import Qt
-from modules.metadata import extract_metadata
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate
+from PyQt6.QtCore import (
+    Qt, QObject, QRunnable, QThreadPool, QAbstractListModel, QModelIndex, QRect, QSize, pyqtSignal
+)
+from PyQt6.QtGui import QColor, QImage, QPen, QPixmap
 
-class ImageThumbnail(QLabel):
-    def __init__(self, image_path, thumbnail_cache, parent=None):
-        super().__init__(parent)
+THUMBNAIL_SIZE = 200
+GRID_SPACING = 6  # QGridLayout 時代と同じサムネイル間の余白
+
+_placeholder_pixmap = None
+
+def placeholder_pixmap():
+    # 未読み込みのサムネイルはすべて同じプレースホルダーを共有する
+    global _placeholder_pixmap
+    if _placeholder_pixmap is None:
+        _placeholder_pixmap = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        _placeholder_pixmap.fill(Qt.GlobalColor.lightGray)
+    return _placeholder_pixmap
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(str, QImage)  # (image_path, image)
+
+class ThumbnailTask(QRunnable):
+    # キャッシュに無いサムネイルをワーカースレッドで QImage として作成する
+    def __init__(self, image_path, thumbnail_cache, signals):
+        super().__init__()
         self.image_path = image_path
         self.thumbnail_cache = thumbnail_cache
-        self.selected = False
-        self.order = -1
-        self.setFixedSize(200, 200)
-        self.setScaledContents(False)
-        self.load_thumbnail()
-        self.setToolTip(os.path.dirname(image_path))
-        self.order_label = QLabel(self)
-        self.order_label.setStyleSheet("color: white; background-color: black;")
-        self.order_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.order_label.setGeometry(0, 0, 30, 30)
-        self.order_label.hide()
-
-    def load_thumbnail(self):
+        self.signals = signals
+
+    def run(self):
+        image = self.thumbnail_cache.get_qimage(self.image_path, THUMBNAIL_SIZE)
         try:
-            pixmap = self.thumbnail_cache.get_thumbnail(self.image_path, 200)
-            if pixmap:
-                self.setPixmap(pixmap)
-            else:
-                self.setText("Error")
-        except Exception as e:
-            print(f"Error loading thumbnail: {e}")
-            self.setText("Failed to load thumbnail")
+            self.signals.loaded.emit(self.image_path, image if image is not None else QImage())
+        except RuntimeError:
+            pass  # 受け取り側のモデルが既に破棄されている
+
+class ThumbnailModel(QAbstractListModel):
+    """表示中の画像パスと選択状態を持つモデル。サムネイルは描画されるときに初めて読み込む"""
+    SelectedRole = Qt.ItemDataRole.UserRole + 1
+    OrderRole = Qt.ItemDataRole.UserRole + 2
+    ErrorRole = Qt.ItemDataRole.UserRole + 3
+
+    def __init__(self, thumbnail_cache, parent=None):
+        super().__init__(parent)
+        self.thumbnail_cache = thumbnail_cache
+        self.paths = []                 # 表示順の画像パス
+        self.rows = {}                  # 画像パス -> 行番号
+        self.selected_paths = set()     # 選択中の画像パス
+        self.selection_order = []       # コピー時の選択順序（画像パス）
+        self.orders = {}                # 画像パス -> コピー時の番号
+        self.pending = set()            # デコード中の画像パス
+        self.pixmaps = {}               # 画像パス -> 表示範囲付近のサムネイルの QPixmap
+        self.failed = set()             # 読み込みに失敗した画像パス
+        self.request_serial = 0         # 後から要求されたサムネイルほど優先して読み込む
+        self.signals = ThumbnailSignals()
+        self.signals.loaded.connect(self.on_thumbnail_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        image_path = self.paths[index.row()]
+        if role == Qt.ItemDataRole.DecorationRole:
+            pixmap = self.pixmaps.get(image_path)
+            if pixmap is not None:
+                return pixmap
+            # QPixmap は表示範囲付近の分だけ持ち、それ以外は QImage のキャッシュから作り直す
+            image = self.thumbnail_cache.find_qimage(image_path, THUMBNAIL_SIZE)
+            if image is not None:
+                pixmap = self.pixmaps[image_path] = QPixmap.fromImage(image)
+                return pixmap
+            self.request_thumbnail(image_path)
+            return placeholder_pixmap()
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return os.path.dirname(image_path)
+        if role == self.SelectedRole:
+            return image_path in self.selected_paths
+        if role == self.OrderRole:
+            return self.orders.get(image_path, -1)
+        if role == self.ErrorRole:
+            return image_path in self.failed
+        return None
+
+    def request_thumbnail(self, image_path):
+        if image_path in self.pending or image_path in self.failed:
+            return
+        # デコードは QThreadPool に任せ、GUI スレッドを止めない
+        # スクロールで通り過ぎた画像より、今見えている（最後に描画された）画像を先に処理する
+        self.pending.add(image_path)
+        self.request_serial += 1
+        QThreadPool.globalInstance().start(
+            ThumbnailTask(image_path, self.thumbnail_cache, self.signals), self.request_serial)
+
+    def on_thumbnail_loaded(self, image_path, image):
+        self.pending.discard(image_path)
+        if image.isNull():
+            self.failed.add(image_path)
+        self.paths_changed([image_path])  # QPixmap への変換は描画されるときに行う
+
+    def paths_changed(self, image_paths):
+        # 変更のあった行をまとめて1回だけ通知する
+        rows = [self.rows[p] for p in image_paths if p in self.rows]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)))
+
+    def set_paths(self, image_paths):
+        """image_paths の順に表示し直す。表示から外れた画像の選択は引き継がない"""
+        self.beginResetModel()
+        self.paths = list(image_paths)
+        self.pixmaps = {}
+        self.rows = {image_path: i for i, image_path in enumerate(self.paths)}
+        self.selected_paths &= self.rows.keys()
+        self.selection_order = [p for p in self.selection_order if p in self.rows]
+        self.orders = {p: i for i, p in enumerate(self.selection_order, start=1)}
+        self.endResetModel()
+
+    def append_paths(self, image_paths):
+        row = len(self.paths)
+        self.beginInsertRows(QModelIndex(), row, row + len(image_paths) - 1)
+        for i, image_path in enumerate(image_paths, start=row):
+            self.paths.append(image_path)
+            self.rows[image_path] = i
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_paths([])
+        self.pending.clear()
+        self.failed.clear()
+
+    def toggle_selection(self, image_path, copy_mode):
+        changed = [image_path]
+        if image_path in self.selected_paths:
+            self.selected_paths.discard(image_path)
+            order = self.orders.pop(image_path, None)
+            if order is not None:
+                # 番号が変わるのは外したサムネイルより後ろだけ
+                index = order - 1
+                self.selection_order.pop(index)
+                for i, p in enumerate(self.selection_order[index:], start=order):
+                    self.orders[p] = i
+                changed.extend(self.selection_order[index:])
+        else:
+            self.selected_paths.add(image_path)
+            if copy_mode:
+                self.selection_order.append(image_path)
+                self.orders[image_path] = len(self.selection_order)
+        self.paths_changed(changed)
+
+    def select_all(self, copy_mode):
+        for image_path in self.paths:
+            if image_path not in self.selected_paths:
+                self.selected_paths.add(image_path)
+                if copy_mode:
+                    self.selection_order.append(image_path)
+                    self.orders[image_path] = len(self.selection_order)
+        if self.paths:
+            self.dataChanged.emit(self.index(0), self.index(len(self.paths) - 1))
+
+    def clear_selection(self):
+        changed = list(self.selected_paths)
+        self.selected_paths.clear()
+        self.selection_order = []
+        self.orders = {}
+        self.paths_changed(changed)
+
+    def selected_images(self):
+        """表示順に並べた選択中の画像パス"""
+        return [image_path for image_path in self.paths if image_path in self.selected_paths]
+
+class ThumbnailDelegate(QStyledItemDelegate):
+    # 選択枠とコピー順の番号はウィジェットを持たずに直接描画する
+    def sizeHint(self, option, index):
+        return QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+
+    def paint(self, painter, option, index):
+        rect = QRect(option.rect.topLeft(), QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        painter.save()
+        if index.data(ThumbnailModel.ErrorRole):
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "Error")
+        else:
+            pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+            painter.drawPixmap(rect.x(), rect.y() + (THUMBNAIL_SIZE - pixmap.height()) // 2, pixmap)
+        if index.data(ThumbnailModel.SelectedRole):
+            painter.setPen(QPen(QColor("orange"), 3))
+            painter.drawRect(rect.adjusted(1, 1, -2, -2))
+        order = index.data(ThumbnailModel.OrderRole)
+        if order > 0:
+            order_rect = QRect(rect.x(), rect.y(), 30, 30)
+            painter.fillRect(order_rect, Qt.GlobalColor.black)
+            painter.setPen(Qt.GlobalColor.white)
+            painter.drawText(order_rect, Qt.AlignmentFlag.AlignCenter, str(order))
+        painter.restore()
+
+class ThumbnailView(QListView):
+    """サムネイル一覧。画面に見えている分しか描画・読み込みしない"""
+    thumbnail_clicked = pyqtSignal(str)
+    metadata_requested = pyqtSignal(str)
+    preview_requested = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns = 5
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.setSelectionMode(QListView.SelectionMode.NoSelection)  # 選択状態はモデル側で持つ
+        self.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.setItemDelegate(ThumbnailDelegate(self))
+        self.update_grid_size()
+        self.verticalScrollBar().valueChanged.connect(self.release_offscreen_pixmaps)
+
+    def set_columns(self, columns):
+        self.columns = columns
+        self.update_grid_size()
+
+    def update_grid_size(self):
+        # 指定の列数で横幅を割り、収まらないときはサムネイルの幅で折り返す
+        cell_width = max(THUMBNAIL_SIZE + GRID_SPACING, self.viewport().width() // self.columns)
+        self.setGridSize(QSize(cell_width, THUMBNAIL_SIZE + GRID_SPACING))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_grid_size()
+
+    def release_offscreen_pixmaps(self):
+        # 大きなフォルダを何度もスクロールすると LRU では直前に見た画像ばかり残るため、
+        # 表示範囲から上下1画面分より離れた QPixmap を手放す（保持している分だけを調べる）
+        model = self.model()
+        if model is None:
+            return
+        area = self.viewport().rect()
+        keep = area.adjusted(0, -area.height(), 0, area.height())
+        for image_path in list(model.pixmaps):
+            row = model.rows.get(image_path)
+            if row is None or not self.visualRect(model.index(row)).intersects(keep):
+                del model.pixmaps[image_path]
+
+    def path_at(self, event):
+        index = self.indexAt(event.position().toPoint())
+        return self.model().paths[index.row()] if index.isValid() else None
 
     def mousePressEvent(self, event):
+        image_path = self.path_at(event)
+        if image_path is None:
+            return
         if event.button() == Qt.MouseButton.LeftButton:
-            self.selected = not self.selected
-            main_window = self.get_main_window()
-            if main_window:
-                if main_window.copy_mode:
-                    if self.selected:
-                        self.order = len(main_window.selection_order) + 1
-                        main_window.selection_order.append(self)
-                        self.order_label.setText(str(self.order))
-                        self.order_label.show()
-                    else:
-                        try:
-                            main_window.selection_order.remove(self)
-                        except ValueError:
-                            pass
-                        self.order = -1
-                        self.order_label.hide()
-                        for i, thumb in enumerate(main_window.selection_order, start=1):
-                            thumb.order = i
-                            thumb.order_label.setText(str(i))
-                else:
-                    self.order = -1
-                    self.order_label.hide()
-                    main_window.update_selected_count()
-            self.setStyleSheet("border: 3px solid orange;" if self.selected else "")
+            self.thumbnail_clicked.emit(image_path)
         elif event.button() == Qt.MouseButton.RightButton:
-            main_window = self.get_main_window()
-            if main_window:
-                # MetadataDialog を直接作成せず、MainWindow のメソッドを使用
-                main_window.show_metadata_dialog(self.image_path)
+            self.metadata_requested.emit(image_path)
 
     def mouseDoubleClickEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            main_window = self.get_main_window()
-            if main_window:
-                from modules.image_dialog import ImageDialog
-                dialog = ImageDialog(self.image_path, main_window.preview_mode, main_window)
-                dialog.exec()
-
-    def get_main_window(self):
-        main_window = self.parent()
-        while main_window is not None and not hasattr(main_window, "update_selected_count"):
-            main_window = main_window.parent()
-        return main_window
+        image_path = self.path_at(event)
+        if image_path is not None and event.button() == Qt.MouseButton.LeftButton:
+            self.preview_requested.emit(image_path)
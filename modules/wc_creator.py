@@ -107,9 +107,9 @@ class WCCreatorDialog(QDialog):
         current_image = self.selected_images[index]
         
         # Update image display
-        pixmap = self.thumbnail_cache.get_thumbnail(current_image, 250)
-        if pixmap:
-            self.image_label.setPixmap(pixmap)
+        image = self.thumbnail_cache.get_qimage(current_image, 250)
+        if image is not None:
+            self.image_label.setPixmap(QPixmap.fromImage(image))
         
         # Update navigation buttons
         self.prev_button.setEnabled(index > 0)
@@ -327,9 +327,9 @@ class OutputDialog(QDialog):
             
             # Image thumbnail
             thumbnail_label = QLabel()
-            pixmap = self.thumbnail_cache.get_thumbnail(image_path, 150)
-            if pixmap:
-                thumbnail_label.setPixmap(pixmap)
+            image = self.thumbnail_cache.get_qimage(image_path, 150)
+            if image is not None:
+                thumbnail_label.setPixmap(QPixmap.fromImage(image))
             thumbnail_label.setFixedSize(150, 150)
             thumbnail_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
             row_layout.addWidget(thumbnail_label)
@@ -2,22 +2,30 @@
 import os
 import sys
 import json
-import shutil
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog,
-    QStatusBar, QTreeView, QSplitter, QGridLayout, QLineEdit, QLabel, QScrollArea,
-    QButtonGroup, QRadioButton, QMessageBox, QApplication
+    QStatusBar, QTreeView, QSplitter, QLineEdit, QLabel,
+    QButtonGroup, QRadioButton, QMessageBox, QApplication, QProgressBar
 )
-from PyQt6.QtCore import Qt, QProcess, QUrl
+from PyQt6.QtCore import Qt, QDir, QProcess, QUrl, QTimer
 from PyQt6.QtGui import QFileSystemModel, QScreen
 from modules.thumbnail_cache import ThumbnailCache
-from modules.image_loader import ImageLoader
+from modules.image_loader import ImageLoader, create_process_pool
 from modules.config import ConfigDialog, ConfigManager
-from modules.metadata import extract_metadata
-from modules.thumbnail_widget import ImageThumbnail
-from modules.image_dialog import MetadataDialog
+from modules.metadata_cache import MetadataCache
+from modules.keyword_filter import build_matcher, split_terms
+from modules.filter_worker import FilterWorker
+from modules.file_worker import EmptyFolderScanner, FileOperationWorker
+from modules.thumbnail_widget import ThumbnailModel, ThumbnailView
+from modules.image_dialog import ImageDialog, MetadataDialog
 from modules.drop_window import DropWindow
 
+# 一部の Linux デスクトップではネイティブのフォルダ選択ダイアログの起動が遅いため Qt 製を使う
+if sys.platform.startswith("linux"):
+    FOLDER_DIALOG_OPTIONS = QFileDialog.Option.ShowDirsOnly | QFileDialog.Option.DontUseNativeDialog
+else:
+    FOLDER_DIALOG_OPTIONS = QFileDialog.Option.ShowDirsOnly
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -26,8 +34,8 @@ class MainWindow(QMainWindow):
         # 初期状態の変数設定
         self.images = []                # 読み込んだ画像のパスリスト
         self.copy_mode = False          # コピー（複数選択）モードか否か
-        self.selection_order = []       # コピー時の選択順序を保持
         self.filter_results = []        # フィルター適用後の画像リスト
+        self.mtimes = {}                # 画像パス -> 更新日時（読み込み時に取得したもの）
         self.thumbnail_columns = 5      # サムネイル表示の列数
         self.ui_state_saved = False     # UI状態保存フラグ
         self.ui_state = {}              # UI状態記憶用辞書
@@ -43,7 +51,13 @@ class MainWindow(QMainWindow):
         self.preview_mode = self.config_data.get("preview_mode", "seamless")
         self.output_format = self.config_data.get("output_format", "separate_lines")
         self.thumbnail_cache = ThumbnailCache(max_size=self.cache_size)
+        self.metadata_cache = MetadataCache()  # フィルタ用メタデータのキャッシュ
         self.image_loader = None
+        self.process_pool = None  # サムネイルのデコード用（最初の読み込みで作り、終了まで使い回す）
+        self.filter_worker = None
+        self.filter_preview_worker = None  # 入力中の一致件数を数えるワーカー
+        self.file_worker = None
+        self.empty_folder_scanner = None
         self.metadata_dialog = None  # MetadataDialog のインスタンスを保持
         self.drop_window = None  # ドロップウィンドウのインスタンスを保持
 
@@ -74,17 +88,21 @@ class MainWindow(QMainWindow):
 
         # ── フォルダツリービュー ──
         self.folder_model = QFileSystemModel()
-        self.folder_model.setRootPath("")
+        # ツリーにはフォルダしか出さないので、ファイルの列挙やシンボリックリンクの解決をさせない
+        self.folder_model.setFilter(QDir.Filter.Dirs | QDir.Filter.Drives | QDir.Filter.NoDotAndDotDot)
+        self.folder_model.setOption(QFileSystemModel.Option.DontResolveSymlinks, True)
         self.tree_view = QTreeView()
         self.tree_view.setModel(self.folder_model)
+        # ルート全体を列挙してから前回のフォルダに切り替えると無駄が大きいので、最初から絞る
         if self.current_folder:
             parent_folder = os.path.dirname(self.current_folder)
             self.folder_model.setRootPath(parent_folder)
             self.tree_view.setRootIndex(self.folder_model.index(parent_folder))
+        else:
+            self.folder_model.setRootPath("")
         self.tree_view.setColumnWidth(0, 150)
-        self.tree_view.setColumnWidth(1, 60)
-        self.tree_view.setColumnWidth(2, 50)
-        self.tree_view.setColumnWidth(3, 100)
+        for column in (1, 2, 3):  # サイズ・種類・更新日時は使わない
+            self.tree_view.hideColumn(column)
         self.tree_view.clicked.connect(self.on_folder_selected)
         self.splitter.addWidget(self.tree_view)
 
@@ -114,6 +132,12 @@ class MainWindow(QMainWindow):
         self.filter_button = QPushButton("Filter")
         self.filter_button.clicked.connect(self.filter_images)
         self.filter_box.returnPressed.connect(self.filter_button.click)
+        # 入力中も一致件数をステータスバーに表示する（入力が止まってから数える）
+        self.filter_preview_timer = QTimer(self)
+        self.filter_preview_timer.setSingleShot(True)
+        self.filter_preview_timer.setInterval(150)
+        self.filter_preview_timer.timeout.connect(self.preview_filter_count)
+        self.filter_box.textChanged.connect(lambda text: self.filter_preview_timer.start())
         # ここを QPushButton から QRadioButton に変更
         self.and_radio = QRadioButton("and")
         self.or_radio = QRadioButton("or")
@@ -176,13 +200,21 @@ class MainWindow(QMainWindow):
         sel_layout.addWidget(self.copy_mode_button)
         image_layout.addLayout(sel_layout)
 
-        # サムネイル表示用のスクロールエリア（グリッドレイアウト）
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.grid_widget = QWidget()
-        self.grid_layout = QGridLayout(self.grid_widget)
-        self.scroll_area.setWidget(self.grid_widget)
-        image_layout.addWidget(self.scroll_area)
+        # サムネイル一覧（画面に見えている分だけ描画し、その分だけ読み込む）
+        self.thumbnail_model = ThumbnailModel(self.thumbnail_cache, self)
+        self.thumbnail_view = ThumbnailView()
+        self.thumbnail_view.setModel(self.thumbnail_model)
+        self.thumbnail_view.set_columns(self.thumbnail_columns)
+        self.thumbnail_view.thumbnail_clicked.connect(self.on_thumbnail_clicked)
+        self.thumbnail_view.metadata_requested.connect(self.show_metadata_dialog)
+        self.thumbnail_view.preview_requested.connect(self.show_image_dialog)
+        image_layout.addWidget(self.thumbnail_view)
+        # 画像が見つからなかったときだけ表示する
+        self.reload_button = QPushButton("Reload")
+        self.reload_button.setStyleSheet("background-color: lightgray; font-size: 16px;")
+        self.reload_button.clicked.connect(self.load_images)
+        self.reload_button.hide()
+        image_layout.addWidget(self.reload_button, alignment=Qt.AlignmentFlag.AlignCenter)
 
         # 移動／コピー操作用ボタン
         move_copy_layout = QHBoxLayout()
@@ -209,6 +241,22 @@ class MainWindow(QMainWindow):
         # ステータスバー
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        # 移動・コピーの進捗（処理中だけ表示する）
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.status_bar.addPermanentWidget(self.progress_bar)
+
+        # 読み込み・移動中に無効化する操作部品（毎回ウィジェットツリー全体を辿らない）
+        self.controllable_widgets = [
+            self.config_button, self.toggle_button, self.tree_view,
+            self.decrement_button, self.columns_display, self.increment_button,
+            self.filter_box, self.and_radio, self.or_radio, self.filter_button,
+            self.filename_asc_radio, self.filename_desc_radio, self.date_asc_radio, self.date_desc_radio,
+            self.select_all_button, self.unselect_button, self.copy_mode_button,
+            self.thumbnail_view, self.reload_button,
+            self.wc_creator_button, self.move_button, self.copy_button, self.dnd_button,
+        ]
 
         # アプリ起動時は必ずフォルダ選択ダイアログを表示する
         # self.current_folder が空でなければ、そのフォルダを初期値に設定する
@@ -265,71 +313,50 @@ class MainWindow(QMainWindow):
                 self.thumbnail_columns -= 1
                 self.update_columns_display()
                 self.update_thumbnail_columns(self.thumbnail_columns)
-        if self.filter_results:
-            self.clear_thumbnails()
-            for i, image_path in enumerate(self.filter_results):
-                thumb = ImageThumbnail(image_path, self.thumbnail_cache, self.grid_widget)
-                self.grid_layout.addWidget(thumb, i // self.thumbnail_columns, i % self.thumbnail_columns)
 
     def update_thumbnail_columns(self, columns):
         self.thumbnail_columns = columns
-        self.clear_thumbnails()
-        current_list = self.filter_results if self.filter_results else self.images
-        for i, image_path in enumerate(current_list):
-            thumb = ImageThumbnail(image_path, self.thumbnail_cache, self.grid_widget)
-            self.grid_layout.addWidget(thumb, i // self.thumbnail_columns, i % self.thumbnail_columns)
+        self.thumbnail_view.set_columns(columns)
+
+    def layout_thumbnails(self, image_paths):
+        """image_paths の順に表示し直す（選択状態と読み込み済みの画像は引き継がれる）"""
+        self.reload_button.hide()
+        self.thumbnail_model.set_paths(image_paths)
 
     def clear_thumbnails(self):
-        for i in reversed(range(self.grid_layout.count())):
-            widget = self.grid_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
+        self.reload_button.hide()
+        self.thumbnail_model.clear()
 
     def sort_images(self, sort_type):
         self.current_sort = sort_type
-        current_state = {}
-        for i in range(self.grid_layout.count()):
-            widget = self.grid_layout.itemAt(i).widget()
-            if widget:
-                current_state[widget.image_path] = {"selected": widget.selected, "order": widget.order}
+        # 移動後の一覧はその場で更新済みなので、並べ替えのたびに存在確認（stat）はしない
         images_to_sort = self.filter_results if self.filter_results else self.images
         
-        # 存在するファイルのみを対象に
-        valid_images = [img for img in images_to_sort if os.path.exists(img)]
-        if len(valid_images) < len(images_to_sort):
-            print(f"Missing files detected: {len(images_to_sort) - len(valid_images)} files not found")
-        
         if sort_type == "filename_asc":
-            sorted_images = sorted(valid_images, key=lambda x: os.path.basename(x).lower())
+            sorted_images = sorted(images_to_sort, key=lambda x: os.path.basename(x).lower())
         elif sort_type == "filename_desc":
-            sorted_images = sorted(valid_images, key=lambda x: os.path.basename(x).lower(), reverse=True)
+            sorted_images = sorted(images_to_sort, key=lambda x: os.path.basename(x).lower(), reverse=True)
         elif sort_type == "date_asc":
-            sorted_images = sorted(valid_images, key=lambda x: os.path.getmtime(x))
+            sorted_images = sorted(images_to_sort, key=self.image_mtime)
         else:  # date_desc
-            sorted_images = sorted(valid_images, key=lambda x: os.path.getmtime(x), reverse=True)
+            sorted_images = sorted(images_to_sort, key=self.image_mtime, reverse=True)
         
-        self.clear_thumbnails()
-        self.selection_order = []
-        for i, image_path in enumerate(sorted_images):
-            thumb = ImageThumbnail(image_path, self.thumbnail_cache, self.grid_widget)
-            if image_path in current_state:
-                state = current_state[image_path]
-                if state['selected']:
-                    thumb.selected = True
-                    thumb.setStyleSheet("border: 3px solid orange;")
-                    if self.copy_mode and state['order'] > 0:
-                        thumb.order = state['order']
-                        thumb.order_label.setText(str(thumb.order))
-                        thumb.order_label.show()
-                        while len(self.selection_order) < state['order']:
-                            self.selection_order.append(None)
-                        self.selection_order[state['order'] - 1] = thumb
-            self.grid_layout.addWidget(thumb, i // self.thumbnail_columns, i % self.thumbnail_columns)
+        self.layout_thumbnails(sorted_images)
         if self.filter_results:
             self.filter_results = sorted_images
         else:
             self.images = sorted_images
 
+    def image_mtime(self, image_path):
+        # 読み込み時に取得した更新日時を使い、並べ替えのたびに stat しない
+        mtime = self.mtimes.get(image_path)
+        if mtime is None:
+            try:
+                mtime = self.mtimes[image_path] = os.path.getmtime(image_path)
+            except OSError:
+                mtime = 0
+        return mtime
+
     def save_last_values(self):
         if not self.tree_view.isVisible():
             self.thumbnail_columns = self.thumbnail_columns - 1
@@ -343,6 +370,7 @@ class MainWindow(QMainWindow):
 
     def update_config(self, new_cache_size, new_preview_mode, new_output_format):
         self.cache_size = new_cache_size
+        self.thumbnail_cache.resize(new_cache_size)  # 共有キャッシュにもすぐ反映する
         self.preview_mode = new_preview_mode
         self.output_format = new_output_format
         self.save_last_values()
@@ -351,10 +379,19 @@ class MainWindow(QMainWindow):
                             f"Preview mode: {new_preview_mode}\n"
                             f"Output format: {'Separate lines' if new_output_format == 'separate_lines' else 'Inline [:100]'}")
 
+    def on_thumbnail_clicked(self, image_path):
+        self.thumbnail_model.toggle_selection(image_path, self.copy_mode)
+        if not self.copy_mode:
+            self.update_selected_count()
+
+    def show_image_dialog(self, image_path):
+        dialog = ImageDialog(image_path, self.preview_mode, self)
+        dialog.exec()
+
     def show_metadata_dialog(self, image_path):
         """画像パスを受け取り、メタデータダイアログを表示または更新する"""
         try:
-            metadata = extract_metadata(image_path)
+            metadata = self.extract_metadata(image_path)
             if not metadata:
                  QMessageBox.warning(self, "メタデータエラー", f"ファイルからメタデータを取得できませんでした:\n{os.path.basename(image_path)}")
                  return
@@ -389,6 +426,22 @@ class MainWindow(QMainWindow):
         # アプリケーション終了時にダイアログも閉じる
         if self.metadata_dialog:
             self.metadata_dialog.close()
+        self.filter_preview_timer.stop()
+        if self.filter_worker:
+            self.filter_worker.wait()
+        if self.filter_preview_worker:
+            self.filter_preview_worker.wait()
+        if self.file_worker:
+            self.file_worker.wait()  # 移動・コピーの途中で終了しない
+        if self.empty_folder_scanner:
+            self.empty_folder_scanner.wait()
+        if self.image_loader:
+            self.image_loader.stop()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=True, cancel_futures=True)
+            self.process_pool = None
+        self.thumbnail_cache.sweep_disk_cache()
+        self.metadata_cache.sweep_disk_cache()
         self.save_last_values()
         super().closeEvent(event)
 
@@ -406,14 +459,14 @@ class MainWindow(QMainWindow):
                 self.ui_state.clear()
                 self.ui_state_saved = False
             else:
-                for widget in self.findChildren(QWidget):
+                for widget in self.controllable_widgets:
                     if widget != self.copy_button:
                         widget.setEnabled(True)
         else:
             if not self.ui_state:
-                self.ui_state = {widget: widget.isEnabled() for widget in self.findChildren(QWidget)}
+                self.ui_state = {widget: widget.isEnabled() for widget in self.controllable_widgets}
                 self.ui_state_saved = True
-            for widget in self.findChildren(QWidget):
+            for widget in self.controllable_widgets:
                 widget.setEnabled(False)
 
     def load_images_from_folder(self, folder):
@@ -422,32 +475,36 @@ class MainWindow(QMainWindow):
         self.set_ui_enabled(False)
         if self.image_loader:
             self.image_loader.stop()
-        self.image_loader = ImageLoader(folder, self.thumbnail_cache)
+            if self.image_loader.pool_broken:
+                self.process_pool.shutdown(wait=False, cancel_futures=True)
+                self.process_pool = None
+        if self.process_pool is None:
+            self.process_pool = create_process_pool()
+        self.image_loader = ImageLoader(folder, self.thumbnail_cache, metadata_cache=self.metadata_cache,
+                                        process_pool=self.process_pool)
         self.image_loader.update_progress.connect(self.update_image_count)
-        self.image_loader.update_thumbnail.connect(self.add_thumbnail)
+        self.image_loader.update_thumbnails.connect(self.add_thumbnails)
         self.image_loader.finished_loading.connect(self.finalize_loading)
         self.image_loader.start()
 
     def update_image_count(self, loaded, total):
-        selected_count = sum(1 for i in range(self.grid_layout.count())
-                             if self.grid_layout.itemAt(i).widget().selected)
+        selected_count = len(self.thumbnail_model.selected_paths)
         if not self.copy_mode:
             self.status_bar.showMessage(f"Total images: {total}, Selected images: {selected_count}")
         else:
             self.status_bar.showMessage(f"Total images: {total}")
 
     def update_selected_count(self):
-        selected_count = sum(1 for i in range(self.grid_layout.count())
-                             if self.grid_layout.itemAt(i).widget().selected)
-        total_images = self.grid_layout.count()
+        selected_count = len(self.thumbnail_model.selected_paths)
+        total_images = self.thumbnail_model.rowCount()
         self.status_bar.showMessage(f"Total images: {total_images}, Selected images: {selected_count}")
 
-    def add_thumbnail(self, image_path, index):
-        thumb = ImageThumbnail(image_path, self.thumbnail_cache, self.grid_widget)
-        self.grid_layout.addWidget(thumb, index // self.thumbnail_columns, index % self.thumbnail_columns)
+    def add_thumbnails(self, image_paths):
+        self.thumbnail_model.append_paths(image_paths)
 
-    def finalize_loading(self, images):
+    def finalize_loading(self, images, mtimes):
         self.images = images
+        self.mtimes = mtimes
         self.sort_images(self.current_sort)  # sort_images は self.filter_results が空なら self.images を使用
         missing_files = [img for img in self.images if not os.path.exists(img)]
         if missing_files:
@@ -461,61 +518,50 @@ class MainWindow(QMainWindow):
             self.show_reload_button()
 
     def show_reload_button(self):
-        reload_button = QPushButton("Reload")
-        reload_button.setStyleSheet("background-color: lightgray; font-size: 16px;")
-        reload_button.clicked.connect(self.load_images)
-        for i in reversed(range(self.grid_layout.count())):
-            widget = self.grid_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-        self.grid_layout.addWidget(reload_button, 0, 0, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.clear_thumbnails()
+        self.reload_button.show()
 
     def select_all(self):
-        for i in range(self.grid_layout.count()):
-            thumb = self.grid_layout.itemAt(i).widget()
-            if thumb and not thumb.selected:
-                thumb.selected = True
-                if self.copy_mode:
-                    thumb.order = len(self.selection_order) + 1
-                    self.selection_order.append(thumb)
-                    thumb.order_label.setText(str(thumb.order))
-                    thumb.order_label.show()
-                thumb.setStyleSheet("border: 3px solid orange;")
+        self.thumbnail_model.select_all(self.copy_mode)
         self.update_selected_count()
 
     def unselect_all(self):
-        for i in range(self.grid_layout.count()):
-            thumb = self.grid_layout.itemAt(i).widget()
-            if thumb:
-                thumb.selected = False
-                thumb.setStyleSheet("")
-                thumb.order = -1
-                thumb.order_label.hide()
-        self.selection_order = []
+        self.thumbnail_model.clear_selection()
         self.update_selected_count()
 
     def check_and_remove_empty_folders(self, folder):
+        # フォルダの走査は別スレッドで行い、見つかった空フォルダはまとめて1回だけ確認する
+        if self.empty_folder_scanner and self.empty_folder_scanner.isRunning():
+            self.empty_folder_scanner.wait()
+        self.empty_folder_scanner = EmptyFolderScanner(folder)
+        self.empty_folder_scanner.finished_scan.connect(self.confirm_remove_empty_folders)
+        self.empty_folder_scanner.start()
+
+    def confirm_remove_empty_folders(self, empty_folders):
+        if not empty_folders:
+            return
         from send2trash import send2trash
-        for root, dirs, files in os.walk(folder):
-            for dir in dirs:
-                dir_path = os.path.join(root, dir)
-                if not os.listdir(dir_path):  # 空フォルダの場合
-                    reply = QMessageBox.question(self, '空のフォルダが見つかりました',
-                                             f'フォルダ "{dir_path}" は空です。削除しますか?',
-                                             QMessageBox.StandardButton.Yes | 
-                                             QMessageBox.StandardButton.No, 
-                                             QMessageBox.StandardButton.No)
-                    if reply == QMessageBox.StandardButton.Yes:
-                        normalized_path = os.path.normpath(dir_path.replace('\\\\?\\', ''))
-                        try:
-                            send2trash(normalized_path)  # ゴミ箱に移動
-                        except Exception as e:
-                            print(f"フォルダの削除中にエラーが発生しました: {e}")
+        listed = "\n".join(empty_folders[:20])
+        if len(empty_folders) > 20:
+            listed += f"\n…ほか {len(empty_folders) - 20} 件"
+        reply = QMessageBox.question(self, '空のフォルダが見つかりました',
+                                     f'{len(empty_folders)} 個の空のフォルダがあります。削除しますか?\n\n{listed}',
+                                     QMessageBox.StandardButton.Yes |
+                                     QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        for dir_path in empty_folders:
+            normalized_path = os.path.normpath(dir_path.replace('\\\\?\\', ''))
+            try:
+                send2trash(normalized_path)  # ゴミ箱に移動
+            except Exception as e:
+                print(f"フォルダの削除中にエラーが発生しました: {e}")
 
     def load_images(self):
         # self.current_folder が空でなければ初期ディレクトリとして設定、なければデフォルト値（空文字列）を設定
         initial_dir = self.current_folder if self.current_folder else ""
-        folder = QFileDialog.getExistingDirectory(self, "Select Image Folder", initial_dir)
+        folder = QFileDialog.getExistingDirectory(self, "Select Image Folder", initial_dir, FOLDER_DIALOG_OPTIONS)
         if folder:
             self.current_folder = folder
             parent_folder = os.path.dirname(folder)
@@ -534,30 +580,37 @@ class MainWindow(QMainWindow):
             self.clear_filter()
             return
         self.status_bar.showMessage("Filtering...")
-        self.filter_button.setEnabled(False)
-        self.filter_box.setEnabled(False)
-        terms = [term.strip() for term in query.split(",") if term.strip()]
-        matches = []
-        # 存在する画像のみをフィルタリング対象にする（より安全）
-        valid_images = [img for img in self.images if os.path.exists(img)]
-        for image_path in valid_images: # self.images の代わりに valid_images を使う
-            metadata_str = extract_metadata(image_path)
-            if self.and_radio.isChecked():
-                if all(term.lower() in metadata_str.lower() for term in terms):
-                    matches.append(image_path)
-            else:
-                if any(term.lower() in metadata_str.lower() for term in terms):
-                    matches.append(image_path)
+        # 途中で別フォルダを開くと古いフォルダの結果が表示されるため、終わるまで操作を止める
+        self.set_ui_enabled(False)
+        match = build_matcher(split_terms(query), self.and_radio.isChecked())
+        # メタデータの読み込みは別スレッドで行い、GUI を止めない
+        self.filter_worker = FilterWorker(self.images, self.metadata_cache, match)
+        self.filter_worker.finished_filtering.connect(self.apply_filter_results)
+        self.filter_worker.start()
 
+    def preview_filter_count(self):
+        query = self.filter_box.text()
+        if not query or not self.images or not self.filter_box.isEnabled():
+            return
+        if self.filter_preview_worker and self.filter_preview_worker.isRunning():
+            self.filter_preview_timer.start()  # 前回の集計が終わってから数え直す
+            return
+        # メタデータは読み込み時にキャッシュ済みなので、ほぼ文字列の検索だけで済む
+        match = build_matcher(split_terms(query), self.and_radio.isChecked())
+        self.filter_preview_worker = FilterWorker(self.images, self.metadata_cache, match)
+        self.filter_preview_worker.finished_filtering.connect(
+            lambda matches: self.status_bar.showMessage(f"Matching images: {len(matches)}"))
+        self.filter_preview_worker.start()
+
+    def apply_filter_results(self, matches):
         # --- ここから修正 ---
         if not matches: # 一致する画像がなかった場合
             self.filter_results = [] # フィルタ結果は空にする
-            self.clear_thumbnails() # サムネイル表示をクリア
+            self.layout_thumbnails([]) # サムネイル表示をクリア（読み込み済みの画像はキャッシュに残る）
             self.status_bar.showMessage("No matching images found.")
             # QMessageBox.information(self, "Filter Result", "No matching images found.")
             # UIを有効に戻す
-            self.filter_button.setEnabled(True)
-            self.filter_box.setEnabled(True)
+            self.set_ui_enabled(True)
             return # ここで処理を終了し、sort_images を呼び出さない
         # --- ここまで修正 ---
 
@@ -566,17 +619,13 @@ class MainWindow(QMainWindow):
         self.sort_images(self.current_sort)  # 現在のソート順を適用して表示
         # ステータスバーのメッセージは sort_images 内で更新されるか、ここで更新
         self.status_bar.showMessage(f"Filtered images: {len(self.filter_results)}") # 件数を表示
-        self.filter_button.setEnabled(True)
-        self.filter_box.setEnabled(True)
+        self.set_ui_enabled(True)
 
     def clear_filter(self):
         self.filter_box.clear() # フィルタ入力欄もクリア
         self.filter_results = []
         # self.clear_thumbnails() # sort_images がクリアするので不要
         self.sort_images(self.current_sort) # 全画像でソートし直して表示
-        # for i, image_path in enumerate(self.images):
-        #     thumb = ImageThumbnail(image_path, self.thumbnail_cache, self.grid_widget)
-        #     self.grid_layout.addWidget(thumb, i // self.thumbnail_columns, i % self.thumbnail_columns)
 
     def toggle_copy_mode(self):
         self.copy_mode = not self.copy_mode
@@ -584,63 +633,66 @@ class MainWindow(QMainWindow):
         self.move_button.setEnabled(not self.copy_mode)
         self.copy_button.setEnabled(self.copy_mode)
         self.wc_creator_button.setEnabled(not self.copy_mode)
-        for i in range(self.grid_layout.count()):
-            thumb = self.grid_layout.itemAt(i).widget()
-            if thumb:
-                thumb.selected = False
-                thumb.setStyleSheet("")
-                thumb.order = -1
-                thumb.order_label.hide()
-        if self.copy_mode:
-            self.selection_order = []
+        self.thumbnail_model.clear_selection()
 
     def move_images(self):
-        folder = QFileDialog.getExistingDirectory(self, "Select Destination Folder")
+        folder = QFileDialog.getExistingDirectory(self, "Select Destination Folder", "", FOLDER_DIALOG_OPTIONS)
         if not folder:
             return
         renamed_files = []
-        selected_images = [self.grid_layout.itemAt(i).widget().image_path 
-                        for i in range(self.grid_layout.count()) 
-                        if self.grid_layout.itemAt(i).widget().selected]
-        for image_path in selected_images:
-            # print(f"Moving: {image_path}")  # ログ追加
+        pairs = []
+        reserved = set()  # 並列に移動するため、同じ名前を二重に割り当てない
+        for image_path in self.thumbnail_model.selected_images():
             base_name, ext = os.path.splitext(os.path.basename(image_path))
             new_path = os.path.join(folder, base_name + ext)
             counter = 1
-            while os.path.exists(new_path):
+            while new_path in reserved or os.path.exists(new_path):
                 new_path = os.path.join(folder, f"{base_name}_{counter}{ext}")
                 counter += 1
-            try:
-                # os.rename を shutil.move に変更
-                shutil.move(image_path, new_path)
-                # print(f"Moved to: {new_path}")  # ログ追加
-            except Exception as e:
-                # エラーハンドリングを改善（より具体的なエラーメッセージを表示）
-                error_msg = f"Error moving {os.path.basename(image_path)} to {folder}: {e}"
-                print(error_msg)
-                QMessageBox.warning(self, "Move Error", error_msg)
-                # エラーが発生した場合、ループを続けるか中断するかを選択できます
-                # ここでは、次のファイルの処理に進むようにしています
-                continue # 次の画像の処理へ
-
+            reserved.add(new_path)
+            pairs.append((image_path, new_path))
             if counter > 1:
                 renamed_files.append(os.path.basename(new_path))
+        self.start_file_operation(pairs, "move", lambda completed, errors: self.finish_move(completed, renamed_files, errors))
 
-        self.unselect_all()
-        # self.filter_box.clear() # フィルタ入力がクリア
-        self.clear_thumbnails()
+    def start_file_operation(self, pairs, operation, on_finished):
+        # 移動・コピーはワーカースレッドで行い、その間 UI を操作できないようにする
+        self.status_bar.showMessage("Moving images..." if operation == "move" else "Copying images...")
+        self.set_ui_enabled(False)
+        self.progress_bar.setRange(0, len(pairs))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setEnabled(True)
+        self.progress_bar.show()
+        self.file_worker = FileOperationWorker(pairs, operation)
+        self.file_worker.progress.connect(lambda processed, total: self.progress_bar.setValue(processed))
+        self.file_worker.finished_operation.connect(self.progress_bar.hide)
+        self.file_worker.finished_operation.connect(on_finished)
+        self.file_worker.start()
+
+    def finish_move(self, completed, renamed_files, errors):
+        self.set_ui_enabled(True)
+        if errors:
+            QMessageBox.warning(self, "Move Error", "\n".join(errors))
 
-        # 移動元のフォルダの画像リストを再読み込み
-        # ImageLoader の folder 属性が正しいか確認が必要
-        # もし self.image_loader.folder が None や古い値の場合、self.current_folder を使う
+        self.unselect_all()
+        # フォルダを読み直さず、移動した画像だけを一覧から外す（読み込み済みのサムネイルはそのまま使う）
+        # 表示中のフォルダの中へ移動した画像は、移動先のパスに置き換える
         source_folder = self.current_folder if hasattr(self, 'current_folder') else ""
+        source_root = os.path.normcase(os.path.abspath(source_folder)) if source_folder else ""
+        moved = {}
+        for src, dst in completed:
+            dst_dir = os.path.normcase(os.path.abspath(os.path.dirname(dst)))
+            try:
+                inside = source_root and os.path.commonpath([dst_dir, source_root]) == source_root
+            except ValueError:
+                inside = False  # Windows で別ドライブへ移動した場合（commonpath が比較できない）
+            moved[src] = dst if inside else None
+        self.images = [moved.get(p, p) for p in self.images if moved.get(p, p)]
+        self.filter_results = [moved.get(p, p) for p in self.filter_results if moved.get(p, p)]
+        self.layout_thumbnails(self.filter_results if self.filter_results else self.images)
+        self.update_selected_count()
+
         if source_folder and os.path.exists(source_folder):
-             # ImageLoader を再生成して再読み込み
-            self.image_loader = ImageLoader(source_folder, self.thumbnail_cache)
-            self.image_loader.update_progress.connect(self.update_image_count)
-            self.image_loader.update_thumbnail.connect(self.add_thumbnail)
-            self.image_loader.finished_loading.connect(self.finalize_loading)
-            self.image_loader.start()
             # 移動元フォルダの空フォルダチェック
             self.check_and_remove_empty_folders(source_folder)
         else:
@@ -653,7 +705,7 @@ class MainWindow(QMainWindow):
                                     "Renamed due to duplicates:\n" + "\n".join(renamed_files))
 
     def copy_images(self):
-        folder = QFileDialog.getExistingDirectory(self, "Select Destination Folder")
+        folder = QFileDialog.getExistingDirectory(self, "Select Destination Folder", "", FOLDER_DIALOG_OPTIONS)
         if folder:
             existing_files = [f for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f))]
             existing_numbers = []
@@ -664,25 +716,31 @@ class MainWindow(QMainWindow):
                 except ValueError:
                     continue
             next_number = max(existing_numbers, default=0) + 1
-            for thumb in self.selection_order:
-                image_path = thumb.image_path
+            pairs = []
+            for image_path in self.thumbnail_model.selection_order:
                 base_name = os.path.basename(image_path)
                 new_path = os.path.join(folder, f"{next_number:03}_{base_name}")
-                try:
-                    shutil.copy2(image_path, new_path)
-                except Exception as e:
-                    print(f"Error copying {image_path}: {e}")
+                # move_images と同様、既存ファイルは上書きしない
+                while os.path.exists(new_path):
+                    next_number += 1
+                    new_path = os.path.join(folder, f"{next_number:03}_{base_name}")
+                pairs.append((image_path, new_path))
                 next_number += 1
-            self.unselect_all()
+            self.start_file_operation(pairs, "copy", self.finish_copy)
+
+    def finish_copy(self, completed, errors):
+        self.set_ui_enabled(True)
+        if errors:
+            QMessageBox.warning(self, "Copy Error", "\n".join(errors))
+        self.unselect_all()
+        self.status_bar.showMessage(f"Copied images: {len(completed)}")
 
     def extract_metadata(self, image_path):
-        return extract_metadata(image_path)
+        return self.metadata_cache.get_metadata(image_path)
     
 
     def open_wc_creator(self):
-        selected_images = [self.grid_layout.itemAt(i).widget().image_path 
-                        for i in range(self.grid_layout.count()) 
-                        if self.grid_layout.itemAt(i).widget().selected]
+        selected_images = self.thumbnail_model.selected_images()
         
         if not selected_images:
             from PyQt6.QtWidgets import QMessageBox